@@ -4,94 +4,528 @@ Processes incoming sensor data from AWS IoT Core
 Stores data in InfluxDB and triggers alerts if needed
 """
 
-import json
+import base64
+import math
 import os
-from datetime import datetime
-from influxdb_client import InfluxDBClient, Point, WritePrecision
+import struct
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+from aws_lambda_powertools import Logger
+from influxdb_client import InfluxDBClient, WritePrecision
 from influxdb_client.client.write_api import SYNCHRONOUS
+from influxdb_client.rest import ApiException
+
+
+# Structured JSON logger; a sampled share of invocations log at DEBUG.
+# inject_lambda_context re-draws the sample on each warm invocation
+# (Powertools 3.8+), so it is not fixed for the container's lifetime.
+logger = Logger(
+    service="coldtrack",
+    level=os.environ.get('LOG_LEVEL', 'INFO'),
+    sample_rate=float(os.environ.get('POWERTOOLS_LOGGER_SAMPLE_RATE', 0.01))
+)
+
+# InfluxDB client is created once per container and reused across warm
+# invocations, so its urllib3 pool keeps the TCP/TLS connection alive
+# between events. A missing env var is recorded here and reported as a
+# 500 by the handler rather than failing the cold start.
+try:
+    _CLIENT = InfluxDBClient(
+        url=os.environ.get('INFLUX_URL', 'http://localhost:8086'),
+        token=os.environ['INFLUX_TOKEN'],
+        org=os.environ.get('INFLUX_ORG', 'coldtrack'),
+        enable_gzip=True,
+        timeout=10_000,
+        connection_pool_maxsize=16
+    )
+    # Writes are synchronous: each invocation already sends all of its
+    # readings in one request, and a background batching thread would be
+    # frozen with unsent points once the handler returns
+    _WRITE_API = _CLIENT.write_api(write_options=SYNCHRONOUS)
+    _INIT_ERROR = None
+except Exception as e:
+    _CLIENT = None
+    _WRITE_API = None
+    _INIT_ERROR = e
+
+_BUCKET = os.environ.get('INFLUX_BUCKET', 'sensors')
+
+# InfluxDB stores timestamps as int64 nanoseconds, so second precision
+# timestamps outside this range are rejected by the server
+_MIN_TIMESTAMP = -9_223_372_036
+_MAX_TIMESTAMP = 9_223_372_036
+
+# Line protocol escaping for tag values, same table as Point's _ESCAPE_KEY
+_TAG_ESCAPES = str.maketrans({
+    ',': r'\,',
+    '=': r'\=',
+    ' ': r'\ ',
+    '\n': r'\n',
+    '\t': r'\t',
+    '\r': r'\r'
+})
+
+# Alert thresholds are fixed for the lifetime of the container
+_TEMP_MIN = float(os.environ.get('TEMP_MIN', 2.0))
+_TEMP_MAX = float(os.environ.get('TEMP_MAX', 8.0))
+_FREEZE_THRESHOLD = float(os.environ.get('FREEZE_ALERT_THRESHOLD', 0.0))
+_BATTERY_LOW_THRESHOLD = float(os.environ.get('BATTERY_LOW_THRESHOLD', 20.0))
+_BATTERY_CRITICAL_THRESHOLD = float(os.environ.get('BATTERY_CRITICAL_THRESHOLD', 10.0))
+_HUMIDITY_MIN = float(os.environ.get('HUMIDITY_MIN', 30.0))
+_HUMIDITY_MAX = float(os.environ.get('HUMIDITY_MAX', 80.0))
+
+# Packed payload published by simulators with payload_format "binary";
+# must match BINARY_PAYLOAD in device/simulator/simulator.py
+_BINARY_PAYLOAD = struct.Struct('<16shhBddIhq')
+
+# Pre-rendered success body for the common no-alert case; this matches
+# orjson.dumps output byte for byte
+_OK_TEMPLATE = '{"message":"Data processed successfully","device_id":%s,"alerts":[]}'
+
+# Recently processed (device_id, timestamp) -> alerts, so IoT
+# re-deliveries within a warm container are not written or alerted twice
+_RECENT = OrderedDict()
+_RECENT_MAX_SIZE = 1024
+
+# Direct-mapped cache of alert payloads: one (key, alerts) entry per slot,
+# overwritten on collision
+_ALERT_CACHE_SIZE = 512
+_ALERT_CACHE_MASK = _ALERT_CACHE_SIZE - 1
+_ALERT_CACHE = [None] * _ALERT_CACHE_SIZE
+
+# Shared type/severity pairs for alert payloads
+_FREEZE_TEMPLATE = {'type': 'FREEZE', 'severity': 'CRITICAL'}
+_LOW_TEMP_TEMPLATE = {'type': 'LOW_TEMP', 'severity': 'WARNING'}
+_HIGH_TEMP_TEMPLATE = {'type': 'HIGH_TEMP', 'severity': 'WARNING'}
+_BATTERY_CRITICAL_TEMPLATE = {'type': 'BATTERY_CRITICAL', 'severity': 'CRITICAL'}
+_BATTERY_LOW_TEMPLATE = {'type': 'BATTERY_LOW', 'severity': 'WARNING'}
+_HUMIDITY_TEMPLATE = {'type': 'HUMIDITY_ALERT', 'severity': 'INFO'}
+
+# Alert bits set by check_alerts
+_FREEZE = 1 << 0
+_LOW_TEMP = 1 << 1
+_HIGH_TEMP = 1 << 2
+_BATTERY_CRITICAL = 1 << 3
+_BATTERY_LOW = 1 << 4
+_HUMIDITY = 1 << 5
+
+# (bit, template, message builder) in the order alerts are reported
+_ALERT_RULES = (
+    (_FREEZE, _FREEZE_TEMPLATE,
+     lambda t, h, b: f'Freeze alert! Temperature: {t}°C'),
+    (_LOW_TEMP, _LOW_TEMP_TEMPLATE,
+     lambda t, h, b: f'Temperature below minimum: {t}°C (Min: {_TEMP_MIN}°C)'),
+    (_HIGH_TEMP, _HIGH_TEMP_TEMPLATE,
+     lambda t, h, b: f'Temperature above maximum: {t}°C (Max: {_TEMP_MAX}°C)'),
+    (_BATTERY_CRITICAL, _BATTERY_CRITICAL_TEMPLATE,
+     lambda t, h, b: f'Critical battery level: {b}%'),
+    (_BATTERY_LOW, _BATTERY_LOW_TEMPLATE,
+     lambda t, h, b: f'Low battery level: {b}%'),
+    (_HUMIDITY, _HUMIDITY_TEMPLATE,
+     lambda t, h, b: f'Humidity out of range: {h}%'),
+)
+
+
+# SNS alert publishing is disabled when SNS_TOPIC_ARN is not configured,
+# in which case boto3 is never imported
+_SNS_TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN')
+if _SNS_TOPIC_ARN:
+    import boto3
+    from botocore.config import Config
+    
+    _SNS = boto3.client(
+        'sns',
+        config=Config(max_pool_connections=50, tcp_keepalive=True)
+    )
+else:
+    _SNS = None
+_SNS_BATCH_SIZE = 10  # publish_batch limit
+_ALERT_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+
 
+def _publish_alerts(alerts):
+    """
+    Publish alerts to SNS in publish_batch requests
+    
+    A single request is sent inline; more are sent concurrently. Waits for
+    every request before returning: a container may be frozen or reaped
+    after the handler returns, so unfinished publishes could be lost.
+    """
+    if _SNS is None:
+        return
+    
+    batches = [
+        [
+            {
+                'Id': str(n),
+                'Subject': f"ColdTrack {alert['severity']}: {alert['type']}",
+                'Message': orjson.dumps(alert).decode()
+            }
+            for n, alert in enumerate(alerts[start:start + _SNS_BATCH_SIZE])
+        ]
+        for start in range(0, len(alerts), _SNS_BATCH_SIZE)
+    ]
+    
+    if len(batches) == 1:
+        _publish_batch(batches[0])
+    else:
+        list(_ALERT_EXECUTOR.map(_publish_batch, batches))
 
+
+def _publish_batch(entries):
+    """
+    Send one publish_batch request, logging failures instead of raising
+    
+    Args:
+        entries: PublishBatchRequestEntries, at most _SNS_BATCH_SIZE
+    """
+    try:
+        response = _SNS.publish_batch(
+            TopicArn=_SNS_TOPIC_ARN,
+            PublishBatchRequestEntries=entries
+        )
+        if response.get('Failed'):
+            logger.error("❌ SNS rejected alerts: %s", response['Failed'])
+    except Exception as e:
+        logger.error("❌ Alert publish failed: %s", e)
+
+
+@logger.inject_lambda_context
 def lambda_handler(event, context):
     """
     Lambda handler for processing sensor data
     
     Args:
-        event: Sensor data from AWS IoT Core
+        event: Sensor data from AWS IoT Core (JSON, or a base64 binary
+            'payload'), or a batch of records from an SQS or Kinesis
+            event source mapping
         context: Lambda context object
     
     Returns:
-        dict: Response with status code and message
+        dict: Response with status code and message, or for SQS/Kinesis
+            batches the partial batch response ({'batchItemFailures': [...]})
     """
     
-    print(f"📥 Received event: {json.dumps(event)}")
+    logger.debug("📥 Received event: %s", event)
+    
+    if 'Records' in event:
+        return _handle_records(event['Records'])
     
     try:
-        # Extract sensor data
-        device_id = event.get('device_id', 'unknown')
-        temperature = float(event.get('temperature', 0))
-        humidity = float(event.get('humidity', 0))
-        battery = float(event.get('battery', 100))
-        timestamp = int(event.get('timestamp', datetime.now().timestamp()))
-        latitude = event.get('latitude')
-        longitude = event.get('longitude')
-        rssi = event.get('rssi', 0)
-        
-        # Connect to InfluxDB
-        client = InfluxDBClient(
-            url=os.environ.get('INFLUX_URL', 'http://localhost:8086'),
-            token=os.environ['INFLUX_TOKEN'],
-            org=os.environ.get('INFLUX_ORG', 'coldtrack')
-        )
-        
-        # Create data point
-        point = Point("sensor_data") \
-            .tag("device_id", device_id) \
-            .field("temperature", temperature) \
-            .field("humidity", humidity) \
-            .field("battery", battery) \
-            .field("rssi", rssi)
+        if _WRITE_API is None:
+            raise RuntimeError(f"InfluxDB client not initialised: {_INIT_ERROR}")
         
-        # Add GPS coordinates if available
-        if latitude and longitude:
-            point.field("latitude", float(latitude))
-            point.field("longitude", float(longitude))
-        
-        point.time(timestamp, WritePrecision.S)
-        
-        # Write to InfluxDB
-        bucket = os.environ.get('INFLUX_BUCKET', 'sensors')
-        write_api = client.write_api(write_options=SYNCHRONOUS)
-        write_api.write(bucket=bucket, record=point)
-        
-        print(f"✅ Data written to InfluxDB: {device_id} - {temperature}°C")
-        
-        # Check for alerts
-        alerts = check_alerts(device_id, temperature, humidity, battery)
-        
-        if alerts:
-            print(f"⚠️  Alerts triggered: {alerts}")
-            # Here you would invoke alert_handler Lambda or send SNS notification
+        device_id, dedup_key, line, alerts = _process_reading(event)
+        if line is not None:
+            _write_readings([(dedup_key, line, alerts)])
         
         return {
             'statusCode': 200,
-            'body': json.dumps({
-                'message': 'Data processed successfully',
-                'device_id': device_id,
-                'alerts': alerts
-            })
+            'body': _render_body(device_id, alerts)
         }
         
     except Exception as e:
-        print(f"❌ Error processing data: {str(e)}")
+        logger.error("❌ Error processing data: %s", e)
         return {
             'statusCode': 500,
-            'body': json.dumps({
+            'body': orjson.dumps({
                 'error': str(e)
-            })
+            }).decode()
         }
-    finally:
-        if 'client' in locals():
-            client.close()
+
+
+def _handle_records(records):
+    """
+    Process an SQS or Kinesis batch
+    
+    Requires ReportBatchItemFailures on the event source mapping. Records
+    that fail to parse, or that InfluxDB rejects, are reported back for
+    retry; the rest are written. Errors that affect the whole batch (client
+    not initialised, transport errors, InfluxDB 5xx) are raised so Lambda
+    retries the batch.
+    
+    Args:
+        records: Event 'Records' list
+    
+    Returns:
+        dict: Partial batch response
+    """
+    if _WRITE_API is None:
+        raise RuntimeError(f"InfluxDB client not initialised: {_INIT_ERROR}")
+    
+    failures = []
+    fresh = []
+    seen = set()
+    for record in records:
+        item_id = record['kinesis']['sequenceNumber'] if 'kinesis' in record \
+            else record['messageId']
+        try:
+            _, dedup_key, line, alerts = _process_reading(_read_record(record))
+        except Exception as e:
+            logger.error("❌ Error processing record %s: %s", item_id, e)
+            failures.append({'itemIdentifier': item_id})
+            continue
+        
+        # Copies of a reading within one batch are only written once
+        if line is None or dedup_key in seen:
+            continue
+        if dedup_key is not None:
+            seen.add(dedup_key)
+        fresh.append((item_id, (dedup_key, line, alerts)))
+    
+    try:
+        _write_readings([entry for _, entry in fresh])
+    except ApiException as e:
+        if not _is_rejected(e):
+            raise
+        # A single bad line fails the whole write, so find which ones
+        failures.extend(_write_individually(fresh))
+    
+    return {'batchItemFailures': failures}
+
+
+def _read_record(record):
+    """
+    Extract the sensor reading from an SQS message or Kinesis record
+    
+    Args:
+        record: Event record
+    
+    Returns:
+        dict: Sensor data
+    """
+    if 'kinesis' in record:
+        return _decode_payload(base64.b64decode(record['kinesis']['data']))
+    return orjson.loads(record['body'])
+
+
+def _is_rejected(error):
+    """
+    Tell whether InfluxDB rejected the written data itself (a 4xx response)
+    
+    Args:
+        error: ApiException raised by the write
+    
+    Returns:
+        bool: True for client errors, False for 5xx and transport errors
+    """
+    return error.status is not None and 400 <= error.status < 500
+
+
+def _write_individually(fresh):
+    """
+    Retry a rejected batch one reading at a time
+    
+    Args:
+        fresh: (item_id, (dedup_key, line, alerts)) for each new reading
+    
+    Returns:
+        list: batchItemFailures entries for the readings InfluxDB rejected
+    """
+    failures = []
+    for item_id, entry in fresh:
+        try:
+            _write_readings([entry])
+        except ApiException as e:
+            if not _is_rejected(e):
+                raise
+            logger.error("❌ InfluxDB rejected record %s: %s", item_id, e)
+            failures.append({'itemIdentifier': item_id})
+    
+    return failures
+
+
+def _write_readings(fresh):
+    """
+    Write new readings to InfluxDB in one call, then record and alert on them
+    
+    Args:
+        fresh: (dedup_key, line, alerts) for each reading not seen before
+    """
+    if not fresh:
+        return
+    
+    _WRITE_API.write(
+        bucket=_BUCKET,
+        record=[line for _, line, _ in fresh],
+        write_precision=WritePrecision.S
+    )
+    logger.debug("✅ %d reading(s) written to InfluxDB", len(fresh))
+    
+    # Only readings confirmed by InfluxDB count as processed
+    _remember(fresh)
+    
+    # Re-delivered readings were already alerted on
+    new_alerts = [alert for _, _, alerts in fresh for alert in alerts]
+    if new_alerts:
+        logger.warning("⚠️  Alerts triggered: %s", new_alerts)
+        _publish_alerts(new_alerts)
+
+
+def _remember(fresh):
+    """
+    Record written readings in the dedup cache, evicting the oldest entries
+    
+    Args:
+        fresh: (dedup_key, line, alerts) for each written reading
+    """
+    for dedup_key, _, alerts in fresh:
+        if dedup_key is None:
+            continue
+        _RECENT[dedup_key] = alerts
+        if len(_RECENT) > _RECENT_MAX_SIZE:
+            _RECENT.popitem(last=False)
+
+
+def _render_body(device_id, alerts):
+    """
+    Render the JSON response body for a processed reading
+    
+    Args:
+        device_id: Device identifier
+        alerts: Alerts raised by the reading
+    
+    Returns:
+        str: Response body
+    """
+    if not alerts:
+        return _OK_TEMPLATE % orjson.dumps(device_id).decode()
+    
+    return orjson.dumps({
+        'message': 'Data processed successfully',
+        'device_id': device_id,
+        'alerts': alerts
+    }).decode()
+
+
+def _decode_payload(raw):
+    """
+    Decode a raw device payload, either JSON or the packed binary layout
+    
+    Args:
+        raw: Payload bytes
+    
+    Returns:
+        dict: Sensor data
+    """
+    # JSON objects start with '{'; binary payloads start with the device ID,
+    # which simulators never let be empty or start with '{'
+    if raw[:1] == b'{':
+        return orjson.loads(raw)
+    
+    device_id, temperature_c10, humidity_p2, battery_pct, latitude, longitude, \
+        timestamp, rssi, message_id = _BINARY_PAYLOAD.unpack(raw)
+    
+    return {
+        'device_id': device_id.rstrip(b'\0').decode(),
+        'temperature_c10': temperature_c10,
+        'humidity_p2': humidity_p2,
+        'battery_pct': battery_pct,
+        'timestamp': timestamp,
+        'latitude': latitude,
+        'longitude': longitude,
+        'rssi': rssi,
+        'message_id': message_id
+    }
+
+
+def _process_reading(reading):
+    """
+    Parse one sensor reading into InfluxDB line protocol and alerts
+    
+    Args:
+        reading: Sensor data dict
+    
+    Returns:
+        tuple: (device_id, dedup_key, line, alerts); line is None when the
+            reading was already processed by this container, dedup_key is
+            None when the reading carries no timestamp
+    """
+    # Binary payloads arrive base64-encoded by the IoT rule
+    if 'payload' in reading:
+        reading = _decode_payload(base64.b64decode(reading['payload']))
+    
+    # Extract sensor data
+    device_id = reading.get('device_id', 'unknown')
+    
+    # An empty tag value is invalid line protocol and would make InfluxDB
+    # reject the whole write, so fail this reading on its own instead
+    if device_id is None or device_id == '':
+        raise ValueError("Reading has an empty device_id")
+    
+    # Simulators send integer readings at sensor resolution; devices may
+    # still send plain float fields
+    temperature_c10 = reading.get('temperature_c10')
+    humidity_p2 = reading.get('humidity_p2')
+    battery_pct = reading.get('battery_pct')
+    temperature = temperature_c10 / 10 if temperature_c10 is not None \
+        else float(reading.get('temperature', 0))
+    humidity = humidity_p2 / 2 if humidity_p2 is not None \
+        else float(reading.get('humidity', 0))
+    battery = float(battery_pct) if battery_pct is not None \
+        else float(reading.get('battery', 100))
+    ts = reading.get('timestamp')
+    latitude = reading.get('latitude')
+    longitude = reading.get('longitude')
+    rssi = reading.get('rssi', 0)
+    
+    # Skip duplicate deliveries of a reading already processed. Readings
+    # without their own timestamp can't be told apart, so are never deduped.
+    if ts is not None:
+        timestamp = int(ts)
+        if not _MIN_TIMESTAMP <= timestamp <= _MAX_TIMESTAMP:
+            raise ValueError(f"Timestamp out of range: {timestamp}")
+        dedup_key = (device_id, timestamp)
+        cached_alerts = _RECENT.get(dedup_key)
+        if cached_alerts is not None:
+            _RECENT.move_to_end(dedup_key)
+            logger.info("♻️  Duplicate reading skipped: %s @ %s", device_id, timestamp)
+            return device_id, dedup_key, None, cached_alerts
+    else:
+        timestamp = int(time.time())
+        dedup_key = None
+    
+    fields = [('temperature', temperature), ('humidity', humidity), ('battery', battery)]
+    
+    # Add GPS coordinates if available
+    if latitude and longitude:
+        fields.append(('latitude', float(latitude)))
+        fields.append(('longitude', float(longitude)))
+    
+    line = _format_line(device_id, fields, int(rssi), timestamp)
+    
+    # Check for alerts
+    alerts = check_alerts(device_id, temperature, humidity, battery)
+    
+    return device_id, dedup_key, line, alerts
+
+
+def _format_line(device_id, fields, rssi, timestamp):
+    """
+    Build an InfluxDB line protocol record directly instead of a Point
+    
+    Args:
+        device_id: Device identifier, written as the device_id tag
+        fields: (name, float) pairs; NaN and infinite values are skipped
+            like Point does, since the server rejects them
+        rssi: Signal strength, written as an integer field
+        timestamp: Unix timestamp in seconds
+    
+    Returns:
+        str: Line protocol record
+    """
+    field_set = ''.join(
+        f"{name}={value},"
+        for name, value in fields
+        if math.isfinite(value)
+    )
+    return (
+        f"sensor_data,device_id={str(device_id).translate(_TAG_ESCAPES)} "
+        f"{field_set}rssi={rssi}i {timestamp}"
+    )
 
 
 def check_alerts(device_id, temperature, humidity, battery):
@@ -105,67 +539,43 @@ def check_alerts(device_id, temperature, humidity, battery):
         battery: Battery level percentage
     
     Returns:
-        list: List of alert messages
+        tuple: Alert dicts, empty when the reading is normal
     """
-    alerts = []
+    # Classify the reading into a bitmask without branching per condition
+    flags = ((temperature < _FREEZE_THRESHOLD) << 0) \
+        | ((temperature < _TEMP_MIN) << 1) \
+        | ((temperature > _TEMP_MAX) << 2) \
+        | ((battery < _BATTERY_CRITICAL_THRESHOLD) << 3) \
+        | ((battery < _BATTERY_LOW_THRESHOLD) << 4) \
+        | (((humidity < _HUMIDITY_MIN) | (humidity > _HUMIDITY_MAX)) << 5)
     
-    # Temperature thresholds
-    temp_min = float(os.environ.get('TEMP_MIN', 2.0))
-    temp_max = float(os.environ.get('TEMP_MAX', 8.0))
-    freeze_threshold = float(os.environ.get('FREEZE_ALERT_THRESHOLD', 0.0))
+    # Fast path for normal readings
+    if flags == 0:
+        return ()
     
-    # Check temperature alerts
-    if temperature < freeze_threshold:
-        alerts.append({
-            'type': 'FREEZE',
-            'severity': 'CRITICAL',
-            'message': f'Freeze alert! Temperature: {temperature}°C',
-            'device_id': device_id
-        })
-    elif temperature < temp_min:
-        alerts.append({
-            'type': 'LOW_TEMP',
-            'severity': 'WARNING',
-            'message': f'Temperature below minimum: {temperature}°C (Min: {temp_min}°C)',
-            'device_id': device_id
-        })
-    elif temperature > temp_max:
-        alerts.append({
-            'type': 'HIGH_TEMP',
-            'severity': 'WARNING',
-            'message': f'Temperature above maximum: {temperature}°C (Max: {temp_max}°C)',
-            'device_id': device_id
-        })
+    # Readings that keep breaching a threshold usually repeat exactly
+    key = (device_id, temperature, humidity, battery)
+    slot = hash(key) & _ALERT_CACHE_MASK
+    entry = _ALERT_CACHE[slot]
+    if entry is not None and entry[0] == key:
+        return entry[1]
     
-    # Check battery alerts
-    battery_low_threshold = float(os.environ.get('BATTERY_LOW_THRESHOLD', 20.0))
-    battery_critical_threshold = float(os.environ.get('BATTERY_CRITICAL_THRESHOLD', 10.0))
+    # Keep one alert per group: freeze > low > high, critical > low battery
+    if flags & (_FREEZE | _LOW_TEMP):
+        flags &= ~_HIGH_TEMP
+    if flags & _FREEZE:
+        flags &= ~_LOW_TEMP
+    if flags & _BATTERY_CRITICAL:
+        flags &= ~_BATTERY_LOW
     
-    if battery < battery_critical_threshold:
-        alerts.append({
-            'type': 'BATTERY_CRITICAL',
-            'severity': 'CRITICAL',
-            'message': f'Critical battery level: {battery}%',
+    alerts = tuple(
+        {
+            **template,
+            'message': message(temperature, humidity, battery),
             'device_id': device_id
-        })
-    elif battery < battery_low_threshold:
-        alerts.append({
-            'type': 'BATTERY_LOW',
-            'severity': 'WARNING',
-            'message': f'Low battery level: {battery}%',
-            'device_id': device_id
-        })
-    
-    # Check humidity (optional)
-    humidity_min = float(os.environ.get('HUMIDITY_MIN', 30.0))
-    humidity_max = float(os.environ.get('HUMIDITY_MAX', 80.0))
-    
-    if humidity < humidity_min or humidity > humidity_max:
-        alerts.append({
-            'type': 'HUMIDITY_ALERT',
-            'severity': 'INFO',
-            'message': f'Humidity out of range: {humidity}%',
-            'device_id': device_id
-        })
-    
+        }
+        for bit, template, message in _ALERT_RULES
+        if flags & bit
+    )
+    _ALERT_CACHE[slot] = (key, alerts)
     return alerts
@@ -5,32 +5,74 @@ Simulates an ESP32-based temperature monitoring device
 Publishes data to AWS IoT Core via MQTT
 """
 
+import copy
 import json
 import time
-import random
 import argparse
+import struct
 import sys
+from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime
 from pathlib import Path
 
-try:
-    from awscrt import io, mqtt
-    from awsiot import mqtt_connection_builder
-except ImportError:
-    print("❌ Error: AWS IoT SDK not installed")
-    print("Run: pip install awsiotsdk")
-    sys.exit(1)
+import numpy as np
+import orjson
+
+
+# Binary payload layout, little-endian: device_id, temperature_c10,
+# humidity_p2, battery_pct, latitude, longitude, timestamp, rssi, message_id.
+# Must match _BINARY_PAYLOAD in the data processor Lambda.
+BINARY_PAYLOAD = struct.Struct('<16shhBddIhq')
+BINARY_DEVICE_ID_SIZE = 16
+
+# Cap on unacknowledged QoS 1 publishes, kept below the AWS IoT in-flight limit
+MAX_IN_FLIGHT = 100
 
 
 class ColdTrackSimulator:
     """Simulates a ColdTrack temperature monitoring device"""
     
-    def __init__(self, config_path="config.json"):
-        """Initialize simulator with configuration"""
-        self.config = self._load_config(config_path)
+    def __init__(self, config_path="config.json", config=None, eager_connect=False):
+        """Initialize simulator with configuration
+        
+        Args:
+            config_path: Path to the JSON configuration file
+            config: Pre-loaded configuration, used instead of config_path
+            eager_connect: Start the MQTT handshake immediately so it overlaps
+                with startup instead of delaying the first publish
+        """
+        self.config = config if config is not None else self._load_config(config_path)
+        self._device_id = self.config['device_id']
+        self._device_id_bytes = self._device_id.encode()
+        self._topic = f"{self.config['topic_prefix']}/{self._device_id}/data"
+        self._binary_payload = self.config.get('payload_format', 'json') == 'binary'
+        
+        # The binary layout has a fixed 16-byte ID field; longer IDs would be
+        # truncated and could collide with another device
+        if self._binary_payload and len(self._device_id_bytes) > BINARY_DEVICE_ID_SIZE:
+            raise ValueError(
+                f"device_id '{self._device_id}' is longer than "
+                f"{BINARY_DEVICE_ID_SIZE} bytes, the binary payload limit"
+            )
+        # The Lambda tells JSON from binary by a leading '{', and an empty ID
+        # can't be stored as a device_id tag
+        if self._binary_payload and self._device_id_bytes[:1] in (b'', b'{'):
+            raise ValueError(
+                f"device_id '{self._device_id}' can't be sent in a binary "
+                f"payload: it must be non-empty and not start with '{{'"
+            )
         self.mqtt_connection = None
+        self._qos = None
         self.is_connected = False
+        self._connect_future = None
+        self._rng = np.random.default_rng()
+        self._pool = None
+        self._pool_idx = 0
         
+        if eager_connect:
+            self.connect(wait=False)
+
     def _load_config(self, config_path):
         """Load configuration from JSON file"""
         try:
@@ -50,6 +92,7 @@ class ColdTrackSimulator:
             "mqtt_endpoint": "REPLACE_WITH_YOUR_IOT_ENDPOINT",
             "topic_prefix": "coldtrack/sensors",
             "publish_interval": 60,
+            "payload_format": "json",
             "temp_range": [2.0, 8.0],
             "temp_variation": 2.0,
             "humidity_range": [50.0, 70.0],
@@ -63,8 +106,24 @@ class ColdTrackSimulator:
             }
         }
     
-    def connect(self):
-        """Establish MQTT connection to AWS IoT Core"""
+    def connect(self, wait=True):
+        """Establish MQTT connection to AWS IoT Core
+        
+        Args:
+            wait: Block until the connection is up; otherwise the handshake
+                continues in the background until await_connected() is called
+        """
+        # Imported here so the module loads without the AWS IoT SDK
+        try:
+            from awscrt import io, mqtt
+            from awsiot import mqtt_connection_builder
+        except ImportError:
+            print("❌ Error: AWS IoT SDK not installed")
+            print("Run: pip install awsiotsdk")
+            sys.exit(1)
+        
+        self._qos = mqtt.QoS.AT_LEAST_ONCE
+        
         print(f"\n🔌 Connecting to AWS IoT Core...")
         print(f"   Device: {self.config['device_id']}")
         print(f"   Endpoint: {self.config['mqtt_endpoint']}")
@@ -86,78 +145,161 @@ class ColdTrackSimulator:
             )
             
             # Connect
-            connect_future = self.mqtt_connection.connect()
-            connect_future.result()
-            self.is_connected = True
-            print("✅ Connected to AWS IoT Core!\n")
+            self._connect_future = self.mqtt_connection.connect()
             
         except Exception as e:
-            print(f"❌ Connection failed: {str(e)}")
-            print("\n💡 Troubleshooting:")
-            print("   1. Check your IoT endpoint in config.json")
-            print("   2. Verify certificate paths are correct")
-            print("   3. Ensure certificates are valid and attached to IoT policy")
-            sys.exit(1)
+            self._connection_failed(e)
+        
+        if wait:
+            self.await_connected()
     
-    def generate_sensor_data(self):
-        """Generate realistic sensor data"""
-        # Temperature with some randomness
-        temp_base = random.uniform(
-            self.config['temp_range'][0],
-            self.config['temp_range'][1]
+    def await_connected(self, timeout=None):
+        """Wait for a pending connection to complete
+        
+        Args:
+            timeout: Seconds to wait, or None to wait indefinitely
+        
+        Returns:
+            bool: True once connected, False if the timeout expired first
+        """
+        if self.is_connected:
+            return True
+        if self._connect_future is None:
+            return False
+        
+        try:
+            self._connect_future.result(timeout)
+        except FutureTimeoutError:
+            return False
+        except Exception as e:
+            self._connection_failed(e)
+        
+        self.is_connected = True
+        print("✅ Connected to AWS IoT Core!\n")
+        return True
+    
+    def _connection_failed(self, error):
+        """Report a connection failure and exit"""
+        print(f"❌ Connection failed: {str(error)}")
+        print("\n💡 Troubleshooting:")
+        print("   1. Check your IoT endpoint in config.json")
+        print("   2. Verify certificate paths are correct")
+        print("   3. Ensure certificates are valid and attached to IoT policy")
+        sys.exit(1)
+    
+    def _refill_pool(self, n=4096):
+        """Pre-generate a batch of random sensor readings"""
+        rng = self._rng
+        temp_range = self.config['temp_range']
+        temp_variation = self.config['temp_variation']
+        humidity_range = self.config['humidity_range']
+        humidity_variation = self.config['humidity_variation']
+        
+        temperature = np.round(
+            rng.uniform(temp_range[0], temp_range[1], n)
+            + rng.uniform(-temp_variation, temp_variation, n),
+            2
         )
-        temperature = round(
-            temp_base + random.uniform(
-                -self.config['temp_variation'],
-                self.config['temp_variation']
-            ),
+        humidity = np.round(
+            rng.uniform(humidity_range[0], humidity_range[1], n)
+            + rng.uniform(-humidity_variation, humidity_variation, n),
             2
         )
         
-        # Humidity
-        humidity = round(
-            random.uniform(
-                self.config['humidity_range'][0],
-                self.config['humidity_range'][1]
-            ) + random.uniform(
-                -self.config['humidity_variation'],
-                self.config['humidity_variation']
-            ),
-            2
+        # Simulate occasional freeze events for testing (5% chance)
+        freeze = rng.random(n) < 0.05
+        temperature = np.where(
+            freeze, np.round(rng.uniform(-2.0, 1.0, n), 2), temperature
         )
         
+        # Columns are stored as Python lists so each tick is a plain index
+        self._pool = (
+            temperature.tolist(),
+            humidity.tolist(),
+            freeze.tolist(),
+            (51.5074 + rng.uniform(-0.01, 0.01, n)).tolist(),  # London area
+            (-0.1278 + rng.uniform(-0.01, 0.01, n)).tolist(),
+            rng.integers(-90, -50, n, endpoint=True).tolist()  # Signal strength
+        )
+        self._pool_idx = 0
+    
+    def generate_sensor_data(self):
+        """Generate realistic sensor data"""
+        if self._pool is None or self._pool_idx >= len(self._pool[0]):
+            self._refill_pool()
+        i = self._pool_idx
+        self._pool_idx += 1
+        temps, humidities, freezes, latitudes, longitudes, rssis = self._pool
+        
         # Battery (slowly draining)
         if not hasattr(self, 'battery_level'):
             self.battery_level = self.config['battery_initial']
         self.battery_level -= self.config['battery_drain_rate']
         self.battery_level = max(0.0, self.battery_level)
         
-        # Simulate occasional freeze events for testing
-        if random.random() < 0.05:  # 5% chance
-            temperature = round(random.uniform(-2.0, 1.0), 2)
+        if freezes[i]:
             print("🧊 Simulating freeze event!")
         
+        now_ns = time.time_ns()
         return {
-            "device_id": self.config['device_id'],
-            "temperature": temperature,
-            "humidity": humidity,
+            "device_id": self._device_id,
+            "temperature": temps[i],
+            "humidity": humidities[i],
             "battery": round(self.battery_level, 2),
-            "timestamp": int(time.time()),
-            "latitude": 51.5074 + random.uniform(-0.01, 0.01),  # London area
-            "longitude": -0.1278 + random.uniform(-0.01, 0.01),
-            "rssi": random.randint(-90, -50),  # Signal strength
-            "message_id": int(time.time() * 1000)
+            "timestamp": now_ns // 1_000_000_000,
+            "latitude": latitudes[i],
+            "longitude": longitudes[i],
+            "rssi": rssis[i],
+            "message_id": now_ns // 1_000_000
         }
     
+    def encode_payload(self, data):
+        """Serialise sensor data as JSON or the packed binary layout
+        
+        Readings are sent as integers at sensor resolution: temperature in
+        tenths of a degree, humidity in half percent, battery in whole percent.
+        """
+        temperature_c10 = int(round(data['temperature'] * 10))
+        humidity_p2 = int(round(data['humidity'] * 2))
+        battery_pct = int(round(data['battery']))
+        
+        if not self._binary_payload:
+            return orjson.dumps({
+                "device_id": data['device_id'],
+                "temperature_c10": temperature_c10,
+                "humidity_p2": humidity_p2,
+                "battery_pct": battery_pct,
+                "timestamp": data['timestamp'],
+                "latitude": data['latitude'],
+                "longitude": data['longitude'],
+                "rssi": data['rssi'],
+                "message_id": data['message_id']
+            })
+        
+        return BINARY_PAYLOAD.pack(
+            self._device_id_bytes,
+            temperature_c10,
+            humidity_p2,
+            battery_pct,
+            data['latitude'],
+            data['longitude'],
+            data['timestamp'],
+            data['rssi'],
+            data['message_id']
+        )
+    
     def publish_data(self, data):
-        """Publish sensor data to AWS IoT Core"""
-        topic = f"{self.config['topic_prefix']}/{self.config['device_id']}/data"
+        """Publish sensor data to AWS IoT Core without waiting for the ack
         
+        Returns:
+            Future that completes when the broker acknowledges the publish,
+            or None if the publish could not be submitted
+        """
         try:
-            self.mqtt_connection.publish(
-                topic=topic,
-                payload=json.dumps(data),
-                qos=mqtt.QoS.AT_LEAST_ONCE
+            publish_future, _ = self.mqtt_connection.publish(
+                topic=self._topic,
+                payload=self.encode_payload(data),
+                qos=self._qos
             )
             
             # Display published data
@@ -172,31 +314,112 @@ class ColdTrackSimulator:
             elif data['temperature'] > 8.0:
                 print(f"   ⚠️  HIGH TEMP ALERT: {data['temperature']}°C")
                 
+            return publish_future
+                
+        except Exception as e:
+            print(f"❌ Publish failed: {str(e)}")
+            return None
+    
+    def _spawn_devices(self, count):
+        """Create virtual devices that share this simulator's MQTT connection"""
+        if count <= 1:
+            return [self]
+        
+        base_id = self.config['device_id']
+        devices = []
+        for n in range(1, count + 1):
+            config = copy.deepcopy(self.config)
+            config['device_id'] = f"{base_id}-{n:02d}"
+            device = ColdTrackSimulator(config=config)
+            device.mqtt_connection = self.mqtt_connection
+            device._qos = self._qos
+            devices.append(device)
+        return devices
+    
+    @staticmethod
+    def _wait_for(publish_future):
+        """Block until a publish is acknowledged, reporting failures"""
+        try:
+            publish_future.result()
         except Exception as e:
             print(f"❌ Publish failed: {str(e)}")
     
-    def run(self):
-        """Main simulation loop"""
+    def _publish_tick(self, simulators, in_flight):
+        """Publish one reading per device, keeping in-flight publishes bounded"""
+        for simulator in simulators:
+            publish_future = simulator.publish_data(simulator.generate_sensor_data())
+            if publish_future is None:
+                continue
+            in_flight.append(publish_future)
+            if len(in_flight) >= MAX_IN_FLIGHT:
+                self._wait_for(in_flight.popleft())
+    
+    def _drain(self, in_flight):
+        """Wait for every outstanding publish to be acknowledged"""
+        while in_flight:
+            self._wait_for(in_flight.popleft())
+    
+    @staticmethod
+    def _sleep_until(next_tick, interval):
+        """Sleep until the next tick on a monotonic clock
+        
+        Scheduling against the clock stops publish time accumulating as
+        drift. If more than a full interval behind, missed ticks are skipped
+        instead of published in a burst.
+        
+        Returns:
+            float: Monotonic time of the tick after this one is due
+        """
+        next_tick += interval
+        delay = next_tick - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        elif delay < -interval:
+            next_tick = time.monotonic()
+        return next_tick
+    
+    def _print_banner(self, devices):
+        """Print the simulator settings"""
         print("\n" + "="*60)
         print("🌡️  ColdTrack Device Simulator")
         print("="*60)
         print(f"Device ID: {self.config['device_id']}")
+        if devices > 1:
+            print(f"Virtual Devices: {devices}")
         print(f"Publish Interval: {self.config['publish_interval']}s")
         print(f"Temperature Range: {self.config['temp_range'][0]}°C to {self.config['temp_range'][1]}°C")
         print("="*60 + "\n")
+    
+    def run(self, devices=1):
+        """Main simulation loop
         
-        self.connect()
+        Args:
+            devices: Number of virtual devices to publish for over one connection
+        """
+        self._print_banner(devices)
+        
+        if self._connect_future is None:
+            self.connect(wait=False)
+        # Pre-generate readings while the handshake is in flight
+        simulators = self._spawn_devices(devices)
+        for simulator in simulators:
+            simulator._refill_pool()
+        self.await_connected()
+        in_flight = deque()
         
         print("📊 Publishing data... (Press Ctrl+C to stop)\n")
         
+        interval = self.config['publish_interval']
+        next_tick = time.monotonic()
+        
         try:
             while True:
-                data = self.generate_sensor_data()
-                self.publish_data(data)
-                time.sleep(self.config['publish_interval'])
+                self._publish_tick(simulators, in_flight)
+                next_tick = self._sleep_until(next_tick, interval)
                 
         except KeyboardInterrupt:
             print("\n\n⏹️  Stopping simulator...")
+            self._drain(in_flight)
             self.disconnect()
     
     def disconnect(self):
@@ -223,17 +446,23 @@ def main():
         type=int,
         help='Override publish interval in seconds'
     )
+    parser.add_argument(
+        '--devices',
+        type=int,
+        default=1,
+        help='Number of virtual devices to simulate over one connection (default: 1)'
+    )
     
     args = parser.parse_args()
     
-    # Create and run simulator
-    simulator = ColdTrackSimulator(args.config)
+    # Create simulator; the MQTT handshake starts straight away
+    simulator = ColdTrackSimulator(args.config, eager_connect=True)
     
     # Override interval if specified
     if args.interval:
         simulator.config['publish_interval'] = args.interval
     
-    simulator.run()
+    simulator.run(devices=args.devices)
 
 
 if __name__ == "__main__":
@@ -141,7 +141,13 @@ package_lambda() {
     # Install dependencies
     if [ -f "$LAMBDA_SOURCE/requirements.txt" ]; then
         print_info "Installing dependencies"
-        pip3 install -r "$LAMBDA_SOURCE/requirements.txt" -t "$PACKAGE_DIR/" --quiet
+        # Fetch Linux wheels so native packages (orjson) import on Lambda
+        # regardless of the host OS
+        pip3 install -r "$LAMBDA_SOURCE/requirements.txt" -t "$PACKAGE_DIR/" --quiet \
+            --platform manylinux2014_x86_64 \
+            --implementation cp \
+            --python-version 3.11 \
+            --only-binary=:all:
     fi
     
     # Create deployment package
@@ -182,7 +188,8 @@ deploy_lambda() {
                 TEMP_MAX=${TEMP_MAX},
                 FREEZE_ALERT_THRESHOLD=${FREEZE_ALERT_THRESHOLD},
                 BATTERY_LOW_THRESHOLD=${BATTERY_LOW_THRESHOLD},
-                BATTERY_CRITICAL_THRESHOLD=${BATTERY_CRITICAL_THRESHOLD}
+                BATTERY_CRITICAL_THRESHOLD=${BATTERY_CRITICAL_THRESHOLD},
+                SNS_TOPIC_ARN=${SNS_TOPIC_ARN}
             }" \
             --region "$REGION" \
             > /dev/null
@@ -208,7 +215,8 @@ deploy_lambda() {
                 TEMP_MAX=${TEMP_MAX},
                 FREEZE_ALERT_THRESHOLD=${FREEZE_ALERT_THRESHOLD},
                 BATTERY_LOW_THRESHOLD=${BATTERY_LOW_THRESHOLD},
-                BATTERY_CRITICAL_THRESHOLD=${BATTERY_CRITICAL_THRESHOLD}
+                BATTERY_CRITICAL_THRESHOLD=${BATTERY_CRITICAL_THRESHOLD},
+                SNS_TOPIC_ARN=${SNS_TOPIC_ARN}
             }" \
             --region "$REGION" \
             > /dev/null
@@ -3,6 +3,7 @@ Unit tests for ColdTrack Lambda data processor
 """
 
 import pytest
+import base64
 import json
 import os
 from unittest.mock import Mock, patch, MagicMock
@@ -136,6 +137,369 @@ class TestAlertChecking:
         assert calculated_severity == severity
 
 
+class TestCheckAlerts:
+    """Test cases for check_alerts classification"""
+    
+    @pytest.fixture
+    def lambda_function(self):
+        """Import the Lambda module (requires influxdb-client)"""
+        return pytest.importorskip("lambda_function")
+    
+    def test_normal_reading_has_no_alerts(self, lambda_function):
+        """Test normal reading returns an empty tuple"""
+        assert lambda_function.check_alerts("CT-001", 5.0, 60.0, 85.0) == ()
+    
+    @pytest.mark.parametrize("temp,alert_type", [
+        (-1.0, "FREEZE"),
+        (1.0, "LOW_TEMP"),
+        (9.0, "HIGH_TEMP"),
+    ])
+    def test_single_temperature_alert(self, lambda_function, temp, alert_type):
+        """Test only the most severe temperature alert is reported"""
+        alerts = lambda_function.check_alerts("CT-001", temp, 60.0, 85.0)
+        
+        assert [a["type"] for a in alerts] == [alert_type]
+        assert alerts[0]["device_id"] == "CT-001"
+    
+    def test_combined_alerts_order(self, lambda_function):
+        """Test multiple alerts are reported in a stable order"""
+        alerts = lambda_function.check_alerts("CT-001", -1.0, 95.0, 5.0)
+        
+        assert [a["type"] for a in alerts] == ["FREEZE", "BATTERY_CRITICAL", "HUMIDITY_ALERT"]
+        assert alerts[1]["severity"] == "CRITICAL"
+
+
+class TestReadingDecoding:
+    """Test cases for decoding device payloads"""
+    
+    @pytest.fixture
+    def lambda_function(self):
+        """Import the Lambda module (requires its dependencies)"""
+        return pytest.importorskip("lambda_function")
+    
+    def test_binary_payload_round_trip(self, lambda_function):
+        """Test packed binary readings decode to scaled integer fields"""
+        raw = lambda_function._BINARY_PAYLOAD.pack(
+            b"CT-001", 55, 130, 85, 51.5074, -0.1278, 1706875200, -67, 1706875200000
+        )
+        
+        reading = lambda_function._decode_payload(raw)
+        
+        assert reading["device_id"] == "CT-001"
+        assert reading["temperature_c10"] == 55
+        assert reading["rssi"] == -67
+    
+    def test_json_payload(self, lambda_function):
+        """Test JSON payloads are detected and parsed"""
+        reading = lambda_function._decode_payload(b'{"device_id": "CT-001"}')
+        
+        assert reading == {"device_id": "CT-001"}
+
+
+class TestLineProtocol:
+    """Test cases for the hand-built line protocol records"""
+    
+    @pytest.fixture
+    def lambda_function(self):
+        """Import the Lambda module (requires its dependencies)"""
+        return pytest.importorskip("lambda_function")
+    
+    def test_matches_point(self, lambda_function):
+        """Test records parse the same as influxdb-client Point output"""
+        from influxdb_client import Point, WritePrecision
+        
+        line = lambda_function._format_line(
+            "CT 001,a=b", [("temperature", 5.5), ("humidity", 65.0)], -67, 1706875200
+        )
+        point = Point("sensor_data") \
+            .tag("device_id", "CT 001,a=b") \
+            .field("temperature", 5.5) \
+            .field("humidity", 65.0) \
+            .field("rssi", -67) \
+            .time(1706875200, WritePrecision.S)
+        
+        # Point sorts fields and drops ".0", so compare parsed values
+        def parse(record):
+            series, field_set, timestamp = record.rsplit(" ", 2)
+            fields = dict(f.split("=") for f in field_set.split(","))
+            values = {k: v if v.endswith("i") else float(v) for k, v in fields.items()}
+            return series, values, timestamp
+        
+        assert parse(line) == parse(point.to_line_protocol())
+    
+    def test_control_characters_escaped(self, lambda_function):
+        """Test a device_id cannot inject extra records"""
+        line = lambda_function._format_line("CT-001\nevil x=1", [], -67, 1706875200)
+        
+        assert "\n" not in line
+        assert line.startswith("sensor_data,device_id=CT-001\\nevil\\ x\\=1 ")
+    
+    def test_non_finite_fields_skipped(self, lambda_function):
+        """Test NaN and infinite readings are dropped from the record"""
+        line = lambda_function._format_line(
+            "CT-001", [("temperature", float("nan")), ("humidity", float("inf"))], -67, 1706875200
+        )
+        
+        assert line == "sensor_data,device_id=CT-001 rssi=-67i 1706875200"
+    
+    def test_non_string_device_id(self, lambda_function):
+        """Test numeric device IDs are written as tag strings"""
+        line = lambda_function._format_line(42, [], -67, 1706875200)
+        
+        assert line.startswith("sensor_data,device_id=42 ")
+
+
+class TestDeduplication:
+    """Test cases for skipping re-delivered readings"""
+    
+    @pytest.fixture
+    def lambda_function(self, monkeypatch):
+        """Lambda module with a mocked InfluxDB writer and an empty cache"""
+        module = pytest.importorskip("lambda_function")
+        monkeypatch.setattr(module, "_WRITE_API", Mock())
+        monkeypatch.setattr(module, "_RECENT", module.OrderedDict())
+        return module
+    
+    @pytest.fixture
+    def lambda_context(self):
+        """Mock Lambda context"""
+        context = Mock()
+        context.function_name = "ColdTrack-Process"
+        context.aws_request_id = "request-1"
+        return context
+    
+    def reading(self, **overrides):
+        """Sample reading with a device timestamp"""
+        return {"device_id": "CT-001", "temperature": 5.5, "humidity": 65.0,
+                "battery": 85.0, "timestamp": 1706875200, **overrides}
+    
+    def test_redelivery_is_not_written_again(self, lambda_function, lambda_context):
+        """Test a reading with the same device and timestamp is skipped"""
+        first = lambda_function.lambda_handler(self.reading(), lambda_context)
+        second = lambda_function.lambda_handler(self.reading(), lambda_context)
+        
+        assert lambda_function._WRITE_API.write.call_count == 1
+        assert second == first
+    
+    def test_readings_without_timestamp_are_not_deduped(self, lambda_function, lambda_context):
+        """Test readings without a device timestamp are always written"""
+        event = self.reading()
+        del event["timestamp"]
+        
+        lambda_function.lambda_handler(event, lambda_context)
+        lambda_function.lambda_handler(event, lambda_context)
+        
+        assert lambda_function._WRITE_API.write.call_count == 2
+        assert len(lambda_function._RECENT) == 0
+    
+    def test_failed_write_is_not_remembered(self, lambda_function, lambda_context):
+        """Test a reading is retried if InfluxDB rejected it"""
+        lambda_function._WRITE_API.write.side_effect = RuntimeError("write failed")
+        
+        response = lambda_function.lambda_handler(self.reading(), lambda_context)
+        
+        assert response["statusCode"] == 500
+        assert len(lambda_function._RECENT) == 0
+    
+    def test_least_recent_entry_evicted(self, lambda_function, lambda_context, monkeypatch):
+        """Test the cache drops the least recently seen reading when full"""
+        monkeypatch.setattr(lambda_function, "_RECENT_MAX_SIZE", 2)
+        
+        for timestamp in (1, 2):
+            lambda_function.lambda_handler(self.reading(timestamp=timestamp), lambda_context)
+        lambda_function.lambda_handler(self.reading(timestamp=1), lambda_context)
+        lambda_function.lambda_handler(self.reading(timestamp=3), lambda_context)
+        
+        assert list(lambda_function._RECENT) == [("CT-001", 1), ("CT-001", 3)]
+
+
+class TestBatchSources:
+    """Test cases for SQS and Kinesis batch events"""
+    
+    @pytest.fixture
+    def lambda_function(self, monkeypatch):
+        """Lambda module with a mocked InfluxDB writer and an empty cache"""
+        module = pytest.importorskip("lambda_function")
+        monkeypatch.setattr(module, "_WRITE_API", Mock())
+        monkeypatch.setattr(module, "_RECENT", module.OrderedDict())
+        return module
+    
+    @pytest.fixture
+    def lambda_context(self):
+        """Mock Lambda context"""
+        context = Mock()
+        context.function_name = "ColdTrack-Process"
+        context.aws_request_id = "request-1"
+        return context
+    
+    def reading(self, timestamp):
+        """Sample JSON reading"""
+        return json.dumps({"device_id": "CT-001", "temperature": 5.5, "humidity": 65.0,
+                           "battery": 85.0, "timestamp": timestamp})
+    
+    def test_sqs_bad_record_reported_good_records_written(self, lambda_function, lambda_context):
+        """Test a malformed SQS message is retried without losing the others"""
+        event = {"Records": [
+            {"messageId": "m-1", "body": self.reading(1)},
+            {"messageId": "m-2", "body": "notjson"},
+            {"messageId": "m-3", "body": self.reading(3)},
+        ]}
+        
+        response = lambda_function.lambda_handler(event, lambda_context)
+        
+        assert response == {"batchItemFailures": [{"itemIdentifier": "m-2"}]}
+        lines = lambda_function._WRITE_API.write.call_args.kwargs["record"]
+        assert [line.rsplit(" ", 1)[1] for line in lines] == ["1", "3"]
+    
+    @pytest.mark.parametrize("device_id", ["", None])
+    def test_empty_device_id_reported_not_written(self, lambda_function, lambda_context, device_id):
+        """Test a reading with an empty device_id fails only its own record"""
+        event = {"Records": [
+            {"messageId": "m-1", "body": self.reading(1)},
+            {"messageId": "m-2", "body": json.dumps({"device_id": device_id, "temperature": 5.5,
+                                                     "timestamp": 2})},
+        ]}
+        
+        response = lambda_function.lambda_handler(event, lambda_context)
+        
+        assert response == {"batchItemFailures": [{"itemIdentifier": "m-2"}]}
+        lines = lambda_function._WRITE_API.write.call_args.kwargs["record"]
+        assert [line.rsplit(" ", 1)[1] for line in lines] == ["1"]
+    
+    def test_duplicate_within_batch_written_once(self, lambda_function, lambda_context, monkeypatch):
+        """Test two copies of a reading in one batch give one line and one alert"""
+        monkeypatch.setattr(lambda_function, "_publish_alerts", Mock())
+        body = json.dumps({"device_id": "CT-001", "temperature": -1.0, "humidity": 65.0,
+                           "battery": 85.0, "timestamp": 1})
+        event = {"Records": [
+            {"messageId": "m-1", "body": body},
+            {"messageId": "m-2", "body": body},
+        ]}
+        
+        response = lambda_function.lambda_handler(event, lambda_context)
+        
+        assert response == {"batchItemFailures": []}
+        assert len(lambda_function._WRITE_API.write.call_args.kwargs["record"]) == 1
+        alerts = lambda_function._publish_alerts.call_args.args[0]
+        assert [a["type"] for a in alerts] == ["FREEZE"]
+    
+    def test_kinesis_binary_record(self, lambda_function, lambda_context):
+        """Test base64 Kinesis data carrying a packed binary payload"""
+        raw = lambda_function._BINARY_PAYLOAD.pack(
+            b"CT-001", 55, 130, 85, 51.5074, -0.1278, 1706875200, -67, 1706875200000
+        )
+        event = {"Records": [{"kinesis": {
+            "sequenceNumber": "49590338271490256608559692538361571095921575989136588898",
+            "data": base64.b64encode(raw).decode()
+        }}]}
+        
+        response = lambda_function.lambda_handler(event, lambda_context)
+        
+        assert response == {"batchItemFailures": []}
+        lines = lambda_function._WRITE_API.write.call_args.kwargs["record"]
+        assert lines[0].startswith("sensor_data,device_id=CT-001 temperature=5.5,humidity=65.0,")
+    
+    def test_write_failure_fails_whole_batch(self, lambda_function, lambda_context):
+        """Test an InfluxDB error is raised so Lambda retries the batch"""
+        lambda_function._WRITE_API.write.side_effect = RuntimeError("write failed")
+        event = {"Records": [{"messageId": "m-1", "body": self.reading(1)}]}
+        
+        with pytest.raises(RuntimeError):
+            lambda_function.lambda_handler(event, lambda_context)
+        assert len(lambda_function._RECENT) == 0
+    
+    def test_out_of_range_timestamp_reported_not_written(self, lambda_function, lambda_context):
+        """Test a timestamp InfluxDB cannot store fails only its own record"""
+        event = {"Records": [
+            {"messageId": "m-1", "body": self.reading(1)},
+            {"messageId": "m-2", "body": self.reading(10 ** 12)},
+        ]}
+        
+        response = lambda_function.lambda_handler(event, lambda_context)
+        
+        assert response == {"batchItemFailures": [{"itemIdentifier": "m-2"}]}
+        lines = lambda_function._WRITE_API.write.call_args.kwargs["record"]
+        assert [line.rsplit(" ", 1)[1] for line in lines] == ["1"]
+    
+    def test_rejected_write_reports_offending_records(self, lambda_function, lambda_context):
+        """Test a 400 from InfluxDB is narrowed down to the records it rejects"""
+        from influxdb_client.rest import ApiException
+        
+        def write(bucket, record, write_precision):
+            if any(line.endswith(" 2") for line in record):
+                raise ApiException(status=400, reason="Bad Request")
+        
+        lambda_function._WRITE_API.write.side_effect = write
+        event = {"Records": [
+            {"messageId": f"m-{n}", "body": self.reading(n)} for n in (1, 2, 3)
+        ]}
+        
+        response = lambda_function.lambda_handler(event, lambda_context)
+        
+        assert response == {"batchItemFailures": [{"itemIdentifier": "m-2"}]}
+        assert list(lambda_function._RECENT) == [("CT-001", 1), ("CT-001", 3)]
+    
+    def test_server_error_fails_whole_batch(self, lambda_function, lambda_context):
+        """Test a 5xx from InfluxDB is raised so Lambda retries the batch"""
+        from influxdb_client.rest import ApiException
+        
+        lambda_function._WRITE_API.write.side_effect = ApiException(status=503, reason="Unavailable")
+        event = {"Records": [{"messageId": "m-1", "body": self.reading(1)}]}
+        
+        with pytest.raises(ApiException):
+            lambda_function.lambda_handler(event, lambda_context)
+        assert lambda_function._WRITE_API.write.call_count == 1
+    
+    def test_uninitialised_client_fails_whole_batch(self, lambda_function, lambda_context, monkeypatch):
+        """Test a cold-start configuration error is raised for batches"""
+        monkeypatch.setattr(lambda_function, "_WRITE_API", None)
+        event = {"Records": [{"messageId": "m-1", "body": self.reading(1)}]}
+        
+        with pytest.raises(RuntimeError):
+            lambda_function.lambda_handler(event, lambda_context)
+
+
+class TestAlertPublishing:
+    """Test cases for SNS alert publishing"""
+    
+    @pytest.fixture
+    def lambda_function(self, monkeypatch):
+        """Lambda module with a mocked SNS client"""
+        module = pytest.importorskip("lambda_function")
+        monkeypatch.setattr(module, "_SNS", Mock())
+        monkeypatch.setattr(module, "_SNS_TOPIC_ARN", "arn:aws:sns:eu-west-2:123456789012:coldtrack-alerts")
+        return module
+    
+    def test_alerts_sent_in_batches_of_ten(self, lambda_function):
+        """Test alerts are split into publish_batch requests and all sent"""
+        alerts = [{"type": "FREEZE", "severity": "CRITICAL", "device_id": f"CT-{n:03d}"}
+                  for n in range(12)]
+        
+        lambda_function._publish_alerts(alerts)
+        
+        calls = lambda_function._SNS.publish_batch.call_args_list
+        assert [len(c.kwargs["PublishBatchRequestEntries"]) for c in calls] == [10, 2]
+    
+    def test_single_batch_sent_inline(self, lambda_function, monkeypatch):
+        """Test one publish_batch request does not go through the thread pool"""
+        monkeypatch.setattr(lambda_function, "_ALERT_EXECUTOR", Mock())
+        
+        lambda_function._publish_alerts([{"type": "FREEZE", "severity": "CRITICAL"}])
+        
+        lambda_function._SNS.publish_batch.assert_called_once()
+        lambda_function._ALERT_EXECUTOR.map.assert_not_called()
+    
+    def test_publish_failure_is_logged_not_raised(self, lambda_function, monkeypatch):
+        """Test an SNS error does not fail the invocation"""
+        monkeypatch.setattr(lambda_function, "logger", Mock())
+        lambda_function._SNS.publish_batch.side_effect = RuntimeError("throttled")
+        
+        lambda_function._publish_alerts([{"type": "FREEZE", "severity": "CRITICAL"}])
+        
+        lambda_function._SNS.publish_batch.assert_called_once()
+        lambda_function.logger.error.assert_called_once()
+
+
 class TestInfluxDBIntegration:
     """Test cases for InfluxDB integration"""
     
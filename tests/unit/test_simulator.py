@@ -10,6 +10,7 @@ import os
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../device/simulator')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../cloud/lambda/data_processor')))
 
 
 class TestSimulator:
@@ -107,6 +108,143 @@ class TestSimulator:
         assert should_alert == expected_alert
 
 
+class TestColdTrackSimulator:
+    """Test cases that exercise ColdTrackSimulator directly (no MQTT needed)"""
+    
+    @pytest.fixture
+    def simulator(self, tmp_path):
+        """Simulator built from the default config"""
+        module = pytest.importorskip("simulator")
+        return module.ColdTrackSimulator(str(tmp_path / "missing.json"))
+    
+    def test_missing_config_uses_defaults(self, simulator):
+        """Test default config is used when the file is not found"""
+        assert simulator.config["device_id"] == "CT-001"
+        assert simulator.is_connected is False
+    
+    def test_topic_precomputed(self, simulator):
+        """Test MQTT topic is built from config"""
+        assert simulator._topic == "coldtrack/sensors/CT-001/data"
+    
+    def test_generated_data_is_serialisable(self, simulator):
+        """Test generated readings have native types and valid ranges"""
+        data = simulator.generate_sensor_data()
+        
+        assert isinstance(data["temperature"], float)
+        assert isinstance(data["humidity"], float)
+        assert isinstance(data["rssi"], int)
+        assert isinstance(data["timestamp"], int)
+        assert -90 <= data["rssi"] <= -50
+        json.dumps(data)
+    
+    def test_payload_is_quantised(self, simulator):
+        """Test readings are sent as scaled integers"""
+        data = simulator.generate_sensor_data()
+        data.update(temperature=5.46, humidity=64.8, battery=99.6)
+        
+        payload = json.loads(simulator.encode_payload(data))
+        
+        assert payload["temperature_c10"] == 55
+        assert payload["humidity_p2"] == 130
+        assert payload["battery_pct"] == 100
+        assert "temperature" not in payload
+    
+    def test_spawned_devices_share_connection(self, simulator):
+        """Test virtual devices publish over the parent's connection and QoS"""
+        simulator.mqtt_connection = Mock()
+        simulator._qos = 1
+        
+        devices = simulator._spawn_devices(2)
+        
+        assert [d.config["device_id"] for d in devices] == ["CT-001-01", "CT-001-02"]
+        assert all(d.mqtt_connection is simulator.mqtt_connection for d in devices)
+        assert all(d._qos == 1 for d in devices)
+
+
+class TestBinaryPayload:
+    """Test cases for the packed binary payload"""
+    
+    @pytest.fixture
+    def simulator_module(self):
+        """Import the simulator module"""
+        return pytest.importorskip("simulator")
+    
+    @pytest.fixture
+    def binary_config(self, simulator_module, tmp_path):
+        """Default config switched to the binary payload format"""
+        config = simulator_module.ColdTrackSimulator(str(tmp_path / "missing.json")).config
+        config["payload_format"] = "binary"
+        return config
+    
+    def test_long_device_id_rejected(self, simulator_module, binary_config):
+        """Test IDs that would be truncated by the 16-byte field are rejected"""
+        config = dict(binary_config, device_id="CT-0001-WAREHOUSE-A")
+        
+        with pytest.raises(ValueError):
+            simulator_module.ColdTrackSimulator(config=config)
+    
+    @pytest.mark.parametrize("device_id", ["", "{CT-001"])
+    def test_ambiguous_device_id_rejected(self, simulator_module, binary_config, device_id):
+        """Test IDs the Lambda would misread as JSON or an empty tag are rejected"""
+        config = dict(binary_config, device_id=device_id)
+        
+        with pytest.raises(ValueError):
+            simulator_module.ColdTrackSimulator(config=config)
+    
+    def test_round_trip_through_lambda(self, simulator_module, binary_config):
+        """Test the Lambda decodes exactly what the simulator encodes"""
+        lambda_function = pytest.importorskip("lambda_function")
+        simulator = simulator_module.ColdTrackSimulator(config=binary_config)
+        data = simulator.generate_sensor_data()
+        data.update(temperature=-1.26, humidity=64.8, battery=85.4)
+        
+        reading = lambda_function._decode_payload(simulator.encode_payload(data))
+        
+        assert reading == {
+            "device_id": "CT-001",
+            "temperature_c10": -13,
+            "humidity_p2": 130,
+            "battery_pct": 85,
+            "timestamp": data["timestamp"],
+            "latitude": data["latitude"],
+            "longitude": data["longitude"],
+            "rssi": data["rssi"],
+            "message_id": data["message_id"]
+        }
+
+
+class TestTickScheduling:
+    """Test cases for the monotonic publish schedule"""
+    
+    @pytest.fixture
+    def simulator_module(self, monkeypatch):
+        """Simulator module with a fake monotonic clock"""
+        module = pytest.importorskip("simulator")
+        self.now = 100.0
+        self.slept = []
+        monkeypatch.setattr(module.time, "monotonic", lambda: self.now)
+        monkeypatch.setattr(module.time, "sleep", self.slept.append)
+        return module
+    
+    def test_sleeps_remaining_interval(self, simulator_module):
+        """Test publish time is subtracted from the sleep"""
+        self.now = 100.4
+        
+        next_tick = simulator_module.ColdTrackSimulator._sleep_until(100.0, 1.0)
+        
+        assert next_tick == 101.0
+        assert self.slept == [pytest.approx(0.6)]
+    
+    def test_missed_ticks_skipped(self, simulator_module):
+        """Test the schedule resets instead of bursting after a long stall"""
+        self.now = 105.0
+        
+        next_tick = simulator_module.ColdTrackSimulator._sleep_until(100.0, 1.0)
+        
+        assert next_tick == 105.0
+        assert self.slept == []
+
+
 class TestMQTTConnection:
     """Test cases for MQTT connection handling"""
     